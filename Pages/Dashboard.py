@@ -8,6 +8,7 @@ import numpy as np
 
 # Importa as configurações do arquivo config.py
 from config import PRAZO_SLA 
+from sincronizacao import sincronizar_dados_da_sessao
 
 # ----------------------------------------------------------------------
 # --- FUNÇÕES DE CÁLCULO (Copiadas da Home para garantir a funcionalidade) ---
@@ -22,21 +23,14 @@ def carregar_dados_e_calcular_dash(df_entrada):
 
     df = df_entrada.copy()
     
-    df['Data'] = df['Data'].astype(str).str.strip()
-    for col in ['Hora Chegada', 'Hora Final']:
-        df[col] = df[col].astype(str).str.strip().replace('', '00:00', regex=False)
-
-    data_hora_chegada_str = df['Data'] + ' ' + df['Hora Chegada']
-    
+    # Data e Horas já chegam normalizadas da Home (linhas inválidas ficam na quarentena)
     # 🟢 ADICIONADO: Tratamento da coluna Data para análise de tendência
-    df['Data Analise'] = pd.to_datetime(df['Data'], format='%d/%m/%Y', errors='coerce')
+    df['Data Analise'] = pd.to_datetime(df['Data'], format='%d/%m/%Y')
 
-    df['Data/Hora Chegada'] = pd.to_datetime(data_hora_chegada_str, format='%d/%m/%Y %H:%M', errors='coerce')
-    df['Data/Hora Final'] = pd.to_datetime(df['Data'] + ' ' + df['Hora Final'], format='%d/%m/%Y %H:%M', errors='coerce')
+    df['Data/Hora Chegada'] = pd.to_datetime(df['Data'] + ' ' + df['Hora Chegada'], format='%d/%m/%Y %H:%M')
+    df['Data/Hora Final'] = pd.to_datetime(df['Data'] + ' ' + df['Hora Final'], format='%d/%m/%Y %H:%M')
     
     df['Duração Total'] = df['Data/Hora Final'] - df['Data/Hora Chegada']
-    
-    df.loc[df['Duração Total'].isna(), 'Duração Total'] = pd.Timedelta(seconds=0)
 
     df['Exige Compl.?'] = (df['Duração Total'] > PRAZO_SLA).map({True: 'SIM', False: 'NÃO'})
     df['Status Visual'] = 'OK' 
@@ -53,6 +47,61 @@ def carregar_dados_e_calcular_dash(df_entrada):
     
     return df
 
+def impressao_digital_tendencia(df_calculado, coluna_grupo):
+    """Hash barato (vetorizado) só das colunas usadas nas tendências, para compor a chave do cache."""
+    colunas = ['Data Analise', coluna_grupo, 'Duração Total', 'Exige Compl.?']
+    return int(pd.util.hash_pandas_object(df_calculado[colunas], index=False).sum())
+
+@st.cache_data(ttl=600)
+def calcular_metricas_moveis(_df_calculado, versao_dados, impressao_digital, coluna_grupo, janela_dias):
+    """
+    Métricas em janela móvel (7/30 dias) por grupo: chamados/dia, taxa de estouro do SLA,
+    média e P90 da Duração Total. Usa rolling temporal sobre uma grade diária por grupo;
+    o cache é indexado pela versão dos dados + impressão digital das colunas usadas.
+    """
+    df = _df_calculado[['Data Analise', coluna_grupo, 'Duração Total', 'Exige Compl.?']].copy()
+    df[coluna_grupo] = df[coluna_grupo].replace('', 'Não Informado')
+    # Como na "Média de Resolução": durações zeradas/negativas ficam fora de média e P90
+    # (o rolling ignora NaN), mas o chamado continua contando em volume e taxa de estouro
+    df['Horas'] = (df['Duração Total'].dt.total_seconds() / 3600).where(df['Duração Total'].dt.total_seconds() > 0)
+    df['Estouro'] = (df['Exige Compl.?'] == 'SIM').astype(float)
+    df['Chamado'] = 1.0
+
+    # Grade diária (do 1º chamado do grupo até a data mais recente): dias sem chamado entram
+    # com 0 chamados e sem duração, em vez de o gráfico ligar os dias vizinhos com uma reta
+    inicio_grupo = df.groupby(coluna_grupo)['Data Analise'].min()
+    ultima_data = df['Data Analise'].max()
+    grades = [
+        pd.DataFrame({coluna_grupo: grupo, 'Data Analise': pd.date_range(inicio, ultima_data, freq='D'), 'Chamado': 0.0})
+        for grupo, inicio in inicio_grupo.items()
+    ]
+    df = pd.concat([df[[coluna_grupo, 'Data Analise', 'Horas', 'Estouro', 'Chamado']]] + grades, ignore_index=True)
+
+    # Ordenação estável: no mesmo dia, a linha da grade fica depois dos chamados
+    por_grupo = df.sort_values([coluna_grupo, 'Data Analise'], kind='stable').set_index('Data Analise').groupby(coluna_grupo)
+    janela = f'{janela_dias}D'
+    horas = por_grupo['Horas'].rolling(janela)
+    estouro = por_grupo['Estouro'].rolling(janela)
+
+    # Sem chamados na janela, taxa/média/P90 ficam NaN (lacuna no gráfico) e 'Chamados' fica 0
+    resultado = pd.DataFrame({
+        'Chamados': por_grupo['Chamado'].rolling(janela).sum(),
+        'Taxa de Estouro (%)': estouro.mean() * 100,
+        'Duração Média (h)': horas.mean(),
+        'Duração P90 (h)': horas.quantile(0.9),
+    })
+
+    # Vários chamados no mesmo dia: a última linha do dia já contém a janela completa
+    resultado = resultado[~resultado.index.duplicated(keep='last')]
+
+    # Nos primeiros dias do grupo a janela ainda está incompleta: divide pelos dias cobertos
+    datas = resultado.index.get_level_values('Data Analise')
+    inicios = inicio_grupo.reindex(resultado.index.get_level_values(coluna_grupo)).to_numpy()
+    dias_cobertos = np.minimum(((datas - inicios).days + 1).to_numpy(), janela_dias)
+    resultado['Chamados por Dia'] = resultado['Chamados'] / dias_cobertos
+
+    return resultado.reset_index()
+
 # ----------------------------------------------------------------------
 # --- EXECUÇÃO DA PÁGINA DASHBOARD ---
 # ----------------------------------------------------------------------
@@ -64,7 +113,12 @@ if 'logged_in' not in st.session_state or not st.session_state.logged_in:
     st.warning("Acesso negado. Por favor, faça login na página inicial.")
     st.stop() 
 
-# 2. Lógica de Carregamento de Dados (Garantir que o DF exista)
+# 2. Aplica as alterações salvas por outras sessões desde a última execução
+# (se for preciso recarregar tudo do Sheets, 'dados_chamados' é removido e a Home recarrega)
+if 'dados_chamados' in st.session_state:
+    sincronizar_dados_da_sessao()
+
+# 3. Lógica de Carregamento de Dados (Garantir que o DF exista)
 if 'dados_chamados' not in st.session_state:
     st.error("Dados não carregados. Retorne à página inicial e faça login.")
     st.stop()
@@ -113,6 +167,42 @@ if not df_calculado.empty and 'Duração Total' in df_calculado.columns:
             st.markdown(f"**CONCLUÍDO (SLA Estourado c/ Compl.):** **<span style='color:#FFD700; font-size:18px;'>{concluido}</span>**", unsafe_allow_html=True)
     
     st.markdown("---")
+
+    # --- TENDÊNCIAS EM JANELA MÓVEL (Analista / Projeto) ---
+    st.subheader("📈 Tendências do SLA (Janela Móvel)")
+
+    col_t1, col_t2, col_t3 = st.columns(3)
+    with col_t1:
+        dimensao = st.selectbox("Agrupar por", ['Analista BO', 'Projeto'], key="tendencia_dimensao")
+    with col_t2:
+        janela_dias = st.radio("Janela", [7, 30], format_func=lambda dias: f"{dias} dias", horizontal=True, key="tendencia_janela")
+    with col_t3:
+        metrica = st.selectbox(
+            "Métrica", 
+            ['Taxa de Estouro (%)', 'Duração Média (h)', 'Duração P90 (h)', 'Chamados por Dia'], 
+            key="tendencia_metrica"
+        )
+
+    df_tendencia = calcular_metricas_moveis(
+        df_calculado, 
+        st.session_state.get('versao_dados', 0), 
+        impressao_digital_tendencia(df_calculado, dimensao), 
+        dimensao, 
+        janela_dias
+    )
+
+    fig_tendencia = px.line(
+        df_tendencia,
+        x='Data Analise',
+        y=metrica,
+        color=dimensao,
+        labels={'Data Analise': 'Data', dimensao: 'Analista' if dimensao == 'Analista BO' else 'Projeto'},
+        height=400
+    )
+    fig_tendencia.update_layout(margin={"t":20, "b":20, "l":20, "r":20})
+    st.plotly_chart(fig_tendencia, use_container_width=True)
+
+    st.markdown("---")
     
     # Prepara o DataFrame para análise dos pendentes (ALERTA)
     df_analise = df_calculado.copy()
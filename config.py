@@ -19,4 +19,20 @@ LISTA_PROJETOS = ['Ambev', 'Saque e Pague', 'Tokio', 'Rumo', 'Outros']
 COLUNAS_ESPERADAS = [
     'ID Chamado', 'Data', 'Hora Agendamento', 'Hora Chegada', 'Hora Final', 
     'Compl. Aberto?', 'ID Compl. Aberto', 'Analista BO', 'Observações', 'Projeto' 
-]
\ No newline at end of file
+]
+
+# Colunas de texto livre: ficam no registro de alterações (ver sincronizacao.py) e só são
+# carregadas ao abrir um chamado para edição ou ao exportar.
+COLUNAS_TEXTO_LONGO = ['Observações']
+COLUNAS_TABELA = [col for col in COLUNAS_ESPERADAS if col not in COLUNAS_TEXTO_LONGO]
+
+# Aba de origem de cada linha ("spreadsheet_id:worksheet_name"); vazia no modo de aba única
+# e para chamados ainda não salvos. Só existe na sessão, nunca é gravada na planilha.
+COLUNA_FONTE = 'Fonte Dados'
+COLUNAS_SESSAO = COLUNAS_TABELA + [COLUNA_FONTE]
+
+# Nº máximo de leituras/escritas simultâneas no Google Sheets (também dimensiona o pool HTTP)
+MAX_CONEXOES_SHEETS = 8
+
+# Quantidade de salvamentos mantidos no feed de alterações compartilhado entre as sessões
+LIMITE_FEED_ALTERACOES = 500
@@ -0,0 +1,184 @@
+# sincronizacao.py (Estado compartilhado entre as sessões: feed de alterações e textos longos)
+
+import threading
+import uuid
+import pandas as pd
+import streamlit as st
+
+from config import LIMITE_FEED_ALTERACOES, COLUNAS_TEXTO_LONGO
+
+# ----------------------------------------------------------------------
+# --- REGISTRO DE ALTERAÇÕES (UM POR PROCESSO DO SERVIDOR) ---
+# ----------------------------------------------------------------------
+
+class TextosIndisponiveis(Exception):
+    """O registro não tem os textos longos de algum chamado (ex.: cache limpo): é preciso recarregar."""
+
+class RegistroAlteracoes:
+    """
+    Contador de versão + log das linhas salvas, compartilhado por todas as sessões.
+    Cada salvamento incrementa a versão e guarda apenas as linhas alteradas; as
+    outras sessões comparam um inteiro a cada rerun e aplicam só o que mudou.
+
+    Também guarda as colunas de texto livre (COLUNAS_TEXTO_LONGO) por 'ID Chamado',
+    fora do DataFrame copiado/hasheado/renderizado a cada rerun. Cada texto leva a
+    versão em que foi gravado, para que uma carga antiga nunca sobrescreva um salvamento.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Identifica esta instância: se o cache for limpo, o registro recomeça na versão 0 com outro id
+        self.id_registro = uuid.uuid4().hex
+        self.versao = 0
+        self.log = []  # [(versao, DataFrame com as linhas alteradas)]
+        self.ultima_tabela = None  # Cópia completa mais recente, usada quando o log já foi truncado
+        self.textos = {col: {} for col in COLUNAS_TEXTO_LONGO}  # {coluna: {ID: (texto, versao)}}
+        self.revisao_textos = 0  # Muda a cada carga/salvamento de textos (chave do cache da exportação)
+
+    def publicar(self, df_linhas, df_completo, textos_alterados=None):
+        """
+        Registra as linhas alteradas por um salvamento (e seus textos longos,
+        {ID Chamado: {coluna: texto}}) e retorna a nova versão.
+        """
+        with self.lock:
+            self.versao += 1
+            self.log.append((self.versao, df_linhas.copy()))
+            del self.log[:-LIMITE_FEED_ALTERACOES]
+            self.ultima_tabela = df_completo
+
+            for id_chamado, textos in (textos_alterados or {}).items():
+                for col, texto in textos.items():
+                    self.textos[col][str(id_chamado)] = (texto, self.versao)
+            self.revisao_textos += 1
+            return self.versao
+
+    def carregar_textos(self, df, id_registro, versao_leitura):
+        """
+        Registra os textos lidos do Sheets por uma sessão que começou a ler na versão
+        `versao_leitura`. Textos salvos depois disso (versão maior) são mantidos.
+        """
+        with self.lock:
+            if id_registro != self.id_registro:
+                return  # Leitura iniciada antes de o registro ser recriado: a sessão vai recarregar
+
+            for col in COLUNAS_TEXTO_LONGO:
+                textos_col = self.textos[col]
+                for id_chamado, texto in zip(df['ID Chamado'], df[col]):
+                    atual = textos_col.get(id_chamado)
+                    if atual is None or atual[1] <= versao_leitura:
+                        textos_col[id_chamado] = (texto, versao_leitura)
+            self.revisao_textos += 1
+
+    def buscar_textos(self, id_chamado):
+        """Retorna {coluna: texto} de um único chamado."""
+        with self.lock:
+            if str(id_chamado) not in self.textos[COLUNAS_TEXTO_LONGO[0]]:
+                raise TextosIndisponiveis([str(id_chamado)])
+            return {col: self.textos[col][str(id_chamado)][0] for col in COLUNAS_TEXTO_LONGO}
+
+    def anexar_textos(self, df, textos_alterados=None):
+        """
+        Devolve uma cópia do DataFrame com as colunas de texto (e as alterações ainda não
+        salvas). Levanta TextosIndisponiveis se faltar texto de algum chamado do DataFrame,
+        em vez de preencher com vazio e apagar as Observações na planilha.
+        """
+        textos_alterados = {str(id_chamado): textos for id_chamado, textos in (textos_alterados or {}).items()}
+        df = df.copy()
+        with self.lock:
+            ids_sem_texto = set(df['ID Chamado']) - set(self.textos[COLUNAS_TEXTO_LONGO[0]]) - set(textos_alterados)
+            if ids_sem_texto:
+                raise TextosIndisponiveis(sorted(ids_sem_texto))
+
+            for col in COLUNAS_TEXTO_LONGO:
+                textos_col = self.textos[col]
+                df[col] = [textos_col[id_chamado][0] if id_chamado in textos_col else '' for id_chamado in df['ID Chamado']]
+
+        for id_chamado, textos in textos_alterados.items():
+            linhas = df['ID Chamado'] == id_chamado
+            for col, texto in textos.items():
+                df.loc[linhas, col] = texto
+
+        return df
+
+    def alteracoes_desde(self, id_registro, versao):
+        """
+        Retorna (id do registro, versão atual, linhas alteradas desde `versao`, tabela completa).
+        A tabela completa só é enviada quando o log não cobre o intervalo pedido ou quando a
+        sessão veio de outro registro (cache limpo). Se nem ela existir, linhas e tabela vêm
+        None e a sessão precisa recarregar do Google Sheets.
+        """
+        with self.lock:
+            mesmo_registro = id_registro == self.id_registro and versao <= self.versao
+            if not mesmo_registro or (self.log and self.log[0][0] > versao + 1):
+                return self.id_registro, self.versao, None, self.ultima_tabela
+
+            linhas = [df for v, df in self.log if v > versao]
+            if not linhas:
+                return self.id_registro, self.versao, pd.DataFrame(), None
+            return self.id_registro, self.versao, pd.concat(linhas, ignore_index=True), None
+
+@st.cache_resource
+def registro_alteracoes():
+    """Instância única do registro, compartilhada por todas as sessões do processo."""
+    return RegistroAlteracoes()
+
+@st.cache_resource
+def travas_das_abas():
+    """{chave da aba: threading.Lock}, compartilhado por todas as sessões do processo."""
+    return {}
+
+def trava_da_aba(chave):
+    """
+    Trava que serializa o ciclo reler-mesclar-regravar de uma aba: sem ela, dois
+    salvamentos simultâneos na mesma aba regravam a tabela e um deles se perde.
+    """
+    # dict.setdefault é atômico: duas sessões nunca recebem travas diferentes para a mesma aba
+    return travas_das_abas().setdefault(chave, threading.Lock())
+
+# ----------------------------------------------------------------------
+# --- APLICAÇÃO DAS ALTERAÇÕES NA SESSÃO ---
+# ----------------------------------------------------------------------
+
+def aplicar_alteracoes(df_atual, df_alteracoes):
+    """Atualiza as linhas existentes (por 'ID Chamado') e acrescenta as novas ao final."""
+    colunas = df_atual.columns
+    alteracoes = df_alteracoes.drop_duplicates(subset=['ID Chamado'], keep='last').set_index('ID Chamado')
+    base = df_atual.set_index('ID Chamado')
+
+    existentes = alteracoes.index.isin(base.index)
+    base.update(alteracoes[existentes])
+
+    return pd.concat([base, alteracoes[~existentes]]).reset_index()[colunas]
+
+def marcar_carga_da_sessao():
+    """Registra em qual registro/versão a sessão começou a ler o Google Sheets."""
+    registro = registro_alteracoes()
+    st.session_state.registro_dados = registro.id_registro
+    st.session_state.versao_dados = registro.versao
+
+def sincronizar_dados_da_sessao():
+    """
+    Compara a versão da sessão com a do registro e, se ela avançou, aplica no
+    st.session_state.dados_chamados apenas as linhas salvas desde então.
+    Se não houver como sincronizar (registro recriado e sem tabela), remove
+    'dados_chamados' para que a Home recarregue do Google Sheets.
+    """
+    registro = registro_alteracoes()
+    id_local = st.session_state.get('registro_dados')
+    versao_local = st.session_state.get('versao_dados', 0)
+
+    if id_local == registro.id_registro and versao_local == registro.versao:
+        return
+
+    id_registro, versao, df_alteracoes, df_completo = registro.alteracoes_desde(id_local, versao_local)
+
+    if df_completo is not None:
+        st.session_state.dados_chamados = df_completo.copy()
+    elif df_alteracoes is None:
+        del st.session_state['dados_chamados']
+        return
+    elif not df_alteracoes.empty:
+        st.session_state.dados_chamados = aplicar_alteracoes(st.session_state.dados_chamados, df_alteracoes)
+
+    st.session_state.registro_dados = id_registro
+    st.session_state.versao_dados = versao
@@ -4,12 +4,16 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta 
 from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np 
 import gspread
+from gspread.utils import absolute_range_name
 from gspread_dataframe import set_with_dataframe, get_as_dataframe
+from requests.adapters import HTTPAdapter
 
 # Importa as configurações do novo arquivo config.py
-from config import COLUNAS_ESPERADAS, PRAZO_SLA, LISTA_PROJETOS, SENHA_ACESSO 
+from config import COLUNAS_ESPERADAS, COLUNAS_TABELA, COLUNAS_SESSAO, COLUNA_FONTE, PRAZO_SLA, LISTA_PROJETOS, SENHA_ACESSO, MAX_CONEXOES_SHEETS 
+from sincronizacao import registro_alteracoes, marcar_carga_da_sessao, sincronizar_dados_da_sessao, trava_da_aba, TextosIndisponiveis
 
 # ----------------------------------------------------------------------
 # --- FUNÇÕES CORE: CONEXÃO, CARGA E SALVAMENTO ---
@@ -17,6 +21,24 @@ from config import COLUNAS_ESPERADAS, PRAZO_SLA, LISTA_PROJETOS, SENHA_ACESSO
 
 USAR_GSHEETS = True
 
+@st.cache_resource(ttl=3600)
+def conectar_cliente_gspread():
+    """Autentica uma única vez e devolve o cliente gspread compartilhado entre as sessões."""
+    creds = st.secrets["gcp_service_account"]
+    client = gspread.service_account_from_dict(creds)
+
+    # Amplia o pool HTTP da sessão autenticada para que as leituras paralelas reutilizem conexões
+    sessao_http = getattr(getattr(client, 'http_client', None), 'session', None) or getattr(client, 'session', None)
+    if sessao_http is not None:
+        sessao_http.mount('https://', HTTPAdapter(pool_connections=MAX_CONEXOES_SHEETS, pool_maxsize=MAX_CONEXOES_SHEETS))
+
+    return client
+
+@st.cache_resource(ttl=3600)
+def abrir_aba(spreadsheet_id, worksheet_name):
+    """Abre (e mantém em cache) uma aba específica de uma planilha."""
+    return conectar_cliente_gspread().open_by_key(spreadsheet_id).worksheet(worksheet_name)
+
 @st.cache_resource(ttl=3600)
 def conectar_google_sheets():
     """Estabelece a conexão real com o Google Sheets."""
@@ -24,67 +46,309 @@ def conectar_google_sheets():
         return None
     
     try:
-        creds = st.secrets["gcp_service_account"]
-        client = gspread.service_account_from_dict(creds)
-        
         spreadsheet_id = st.secrets["spreadsheet_id"]
         worksheet_name = st.secrets["worksheet_name"]
         
-        sheet = client.open_by_key(spreadsheet_id)
-        return sheet.worksheet(worksheet_name)
+        return abrir_aba(spreadsheet_id, worksheet_name)
     except Exception as e:
         st.error(f"Erro CRÍTICO ao conectar com Google Sheets. Verifique o ID/Secrets. Erro: {e}")
         return None
 
-def carregar_dados_do_sheets():
-    """Lê todos os dados da planilha e os carrega como um DataFrame."""
-    if not USAR_GSHEETS:
-        return pd.DataFrame(columns=COLUNAS_ESPERADAS)
-
-    worksheet = conectar_google_sheets()
-    if worksheet is None:
-        return pd.DataFrame(columns=COLUNAS_ESPERADAS)
-    
+def listar_fontes_dados():
+    """
+    Lê a lista opcional `fontes_dados` do secrets.toml (uma tabela por aba, com
+    `worksheet_name`, `spreadsheet_id` opcional e `projeto` opcional).
+    Retorna None quando só a aba única (`worksheet_name`) está configurada.
+    O 'ID Chamado' identifica o chamado em todas as abas: um ID repetido em
+    abas diferentes não é mesclado, vai para a quarentena.
+    """
     try:
-        df = get_as_dataframe(worksheet, header=0, evaluate_formulas=True, dtype=str, index_col=None)
-    except Exception as e:
-        st.error(f"Erro ao tentar ler o DataFrame. Erro: {e}")
-        return pd.DataFrame(columns=COLUNAS_ESPERADAS)
-    
+        fontes = st.secrets["fontes_dados"]
+    except Exception:
+        return None
+
+    spreadsheet_padrao = st.secrets.get("spreadsheet_id")
+    lista = []
+    for fonte in fontes:
+        spreadsheet_id = fonte.get('spreadsheet_id', spreadsheet_padrao)
+        lista.append({
+            'chave': f"{spreadsheet_id}:{fonte['worksheet_name']}",
+            'spreadsheet_id': spreadsheet_id,
+            'worksheet_name': fonte['worksheet_name'],
+            'projeto': fonte.get('projeto'),
+        })
+    return lista
+
+def normalizar_ids(serie):
+    """Forma canônica do 'ID Chamado': sem espaços nas pontas e sem o '.0' de números lidos como float."""
+    return serie.astype(str).str.strip().str.replace(r'\.0$', '', regex=True)
+
+def padronizar_dataframe(df):
+    """Garante as colunas esperadas, remove linhas sem ID e limpa valores vazios."""
     for col in COLUNAS_ESPERADAS:
         if col not in df.columns:
             df[col] = '' 
 
     df = df[COLUNAS_ESPERADAS].copy() 
+    df = df.replace(r'^\s*$', np.nan, regex=True)
     df = df.dropna(subset=['ID Chamado']).reset_index(drop=True) 
     
     if not df.empty:
-          df['ID Chamado'] = df['ID Chamado'].astype(str).str.replace(r'\.0$', '', regex=True)
-          df = df.replace(r'^\s*$', np.nan, regex=True).fillna('') 
+          df['ID Chamado'] = normalizar_ids(df['ID Chamado'])
+
+    return df.fillna('')
+
+def normalizar_horas(serie):
+    """Converte 'H:MM', 'HH:MM' e 'HH:MM:SS' para 'HH:MM'. Valores vazios ou inválidos viram NaN."""
+    partes = serie.astype(str).str.strip().str.extract(r'^(\d{1,2}):(\d{2})(?::(\d{2}))?$')
+    numeros = partes.astype(float)
+    validas = (numeros[0] < 24) & (numeros[1] < 60) & ~(numeros[2] >= 60)
+    return (partes[0].str.zfill(2) + ':' + partes[1]).where(validas)
+
+def normalizar_datas(serie):
+    """Converte 'D/M/AAAA' e 'AAAA-MM-DD' (com ou sem horário) para 'DD/MM/AAAA'. Inválidas viram NaN."""
+    texto = serie.astype(str).str.strip()
+    formato_br = texto.str.extract(r'^(?P<day>\d{1,2})/(?P<month>\d{1,2})/(?P<year>\d{4})$')
+    formato_iso = texto.str.extract(r'^(?P<year>\d{4})-(?P<month>\d{1,2})-(?P<day>\d{1,2})(?:[ T].*)?$')
+    partes = formato_br.combine_first(formato_iso)[['year', 'month', 'day']].astype(float)
+    datas = pd.to_datetime(partes, errors='coerce')
+    return datas.dt.strftime('%d/%m/%Y').where(datas.notna())
+
+def normalizar_dados(df_bruto):
+    """
+    Padroniza Data e Horas em uma única passada vetorizada, logo na carga.
+    Linhas que não podem ser interpretadas vão para a quarentena com o motivo,
+    em vez de virarem '00:00' ou duração zero. Retorna (df_limpo, df_quarentena).
+    Sem cache: roda uma vez por carga e o resultado já fica no session_state.
+    """
+    if df_bruto.empty:
+        return df_bruto.copy(), pd.DataFrame(columns=COLUNAS_ESPERADAS + [COLUNA_FONTE, 'Motivo'])
+
+    df = df_bruto.copy()
+    datas = normalizar_datas(df['Data'])
+    horas = {col: normalizar_horas(df[col]) for col in ['Hora Agendamento', 'Hora Chegada', 'Hora Final']}
+
+    problemas = {
+        'Data vazia ou inválida': datas.isna(),
+        'Hora Chegada vazia ou inválida': horas['Hora Chegada'].isna(),
+        'Hora Final vazia ou inválida': horas['Hora Final'].isna(),
+        # Hora Agendamento é opcional: só invalida quando preenchida
+        'Hora Agendamento inválida': horas['Hora Agendamento'].isna() & (df['Hora Agendamento'].str.strip() != ''),
+        'ID Chamado duplicado': df.duplicated(subset=['ID Chamado', COLUNA_FONTE], keep=False),
+        'ID Chamado repetido em outra aba': df.groupby('ID Chamado')[COLUNA_FONTE].transform('nunique') > 1,
+    }
+    motivo = pd.Series('', index=df.index)
+    for descricao, mascara in problemas.items():
+        motivo = motivo.mask(mascara, motivo + descricao + '; ')
+    em_quarentena = motivo != ''
+
+    df_quarentena = df[em_quarentena].copy()
+    df_quarentena['Motivo'] = motivo[em_quarentena].str.rstrip('; ')
+
+    df['Data'] = datas
+    for col, valores in horas.items():
+        df[col] = valores
+    df_limpo = df[~em_quarentena].fillna('').reset_index(drop=True)
+
+    return df_limpo, df_quarentena.reset_index(drop=True)
+
+def valores_para_dataframe(valores):
+    """Converte a matriz de valores da API (1ª linha = cabeçalho) em DataFrame de strings."""
+    if not valores:
+        return pd.DataFrame(columns=COLUNAS_ESPERADAS)
+
+    cabecalho = [str(col).strip() for col in valores[0]]
+    largura = len(cabecalho)
+    # A API omite as células vazias no fim de cada linha
+    linhas = [linha[:largura] + [''] * (largura - len(linha)) for linha in valores[1:]]
+    return pd.DataFrame(linhas, columns=cabecalho, dtype=str)
+
+def ler_abas_da_planilha(client, spreadsheet_id, nomes_abas):
+    """Abre a planilha e lê várias abas dela em uma única requisição (values_batch_get)."""
+    planilha = client.open_by_key(spreadsheet_id)
+    intervalos = [absolute_range_name(nome) for nome in nomes_abas]
+    resposta = planilha.values_batch_get(intervalos)
+    blocos = resposta.get('valueRanges', [])
+    return {nome: valores_para_dataframe(bloco.get('values', [])) for nome, bloco in zip(nomes_abas, blocos)}
+
+def carregar_dados_de_multiplas_abas(fontes):
+    """
+    Lê todas as abas configuradas em paralelo e une o resultado em um único DataFrame.
+    As abas de uma mesma planilha vão em uma só requisição; planilhas diferentes são
+    lidas simultaneamente pelo mesmo cliente autenticado.
+    Cada linha leva a aba de origem na coluna COLUNA_FONTE.
+    """
+    abas_por_planilha = {}
+    for fonte in fontes:
+        abas_por_planilha.setdefault(fonte['spreadsheet_id'], []).append(fonte['worksheet_name'])
+
+    # O cliente vem do cache no thread principal; abertura + leitura de cada planilha rodam no worker
+    client = conectar_cliente_gspread()
+
+    with ThreadPoolExecutor(max_workers=min(MAX_CONEXOES_SHEETS, len(abas_por_planilha))) as executor:
+        futuros = {
+            spreadsheet_id: executor.submit(ler_abas_da_planilha, client, spreadsheet_id, abas)
+            for spreadsheet_id, abas in abas_por_planilha.items()
+        }
+        resultados = {spreadsheet_id: futuro.result() for spreadsheet_id, futuro in futuros.items()}
+
+    frames = []
+    for fonte in fontes:
+        df_aba = padronizar_dataframe(resultados[fonte['spreadsheet_id']][fonte['worksheet_name']])
+        df_aba[COLUNA_FONTE] = fonte['chave']
+        frames.append(df_aba)
+
+    return pd.concat(frames, ignore_index=True)
+
+def carregar_dados_do_sheets():
+    """
+    Lê todos os dados da planilha e os carrega como um DataFrame já normalizado.
+    As linhas inválidas ficam em st.session_state.quarentena_chamados e as colunas
+    de texto livre vão para o registro de alterações (o DataFrame retornado é estreito).
+    """
+    if not USAR_GSHEETS:
+        return pd.DataFrame(columns=COLUNAS_SESSAO)
 
+    fontes = listar_fontes_dados()
+    if fontes:
+        try:
+            df = carregar_dados_de_multiplas_abas(fontes)
+        except Exception as e:
+            st.error(f"Erro ao tentar ler as abas configuradas em 'fontes_dados'. Erro: {e}")
+            return pd.DataFrame(columns=COLUNAS_SESSAO)
+    else:
+        worksheet = conectar_google_sheets()
+        if worksheet is None:
+            return pd.DataFrame(columns=COLUNAS_SESSAO)
+        
+        try:
+            df = get_as_dataframe(worksheet, header=0, evaluate_formulas=True, dtype=str, index_col=None)
+        except Exception as e:
+            st.error(f"Erro ao tentar ler o DataFrame. Erro: {e}")
+            return pd.DataFrame(columns=COLUNAS_SESSAO)
+        
+        df = padronizar_dataframe(df)
+        df[COLUNA_FONTE] = ''
+
+    df, st.session_state.quarentena_chamados = normalizar_dados(df)
+    registro_alteracoes().carregar_textos(df, st.session_state.registro_dados, st.session_state.versao_dados)
+    return df[COLUNAS_SESSAO]
+
+def definir_fontes_novas(df, fontes):
+    """
+    Preenche COLUNA_FONTE das linhas que ainda não têm aba: a aba cujo `projeto`
+    coincide com o do chamado ou, na falta dela, a primeira aba configurada.
+    """
+    aba_por_projeto = {fonte['projeto']: fonte['chave'] for fonte in fontes if fonte['projeto']}
+    sem_fonte = df[COLUNA_FONTE] == ''
+    df.loc[sem_fonte, COLUNA_FONTE] = df.loc[sem_fonte, 'Projeto'].map(aba_por_projeto).fillna(fontes[0]['chave'])
     return df
 
-def salvar_dataframe_no_sheets(df_completo_original):
-    """Escreve o DataFrame de volta no Google Sheets."""
-    
-    df_para_sheets = df_completo_original[COLUNAS_ESPERADAS] 
+def mesclar_com_planilha(df_planilha, df_alteradas):
+    """
+    Aplica as linhas alteradas sobre o conteúdo atual da aba, por 'ID Chamado'. As demais
+    linhas (inclusive as da quarentena, talvez já corrigidas no Sheets) ficam como estão e
+    na mesma posição; chamados novos entram no final.
+    """
+    df_planilha = df_planilha.loc[:, ~df_planilha.columns.astype(str).str.match(r'^(Unnamed:.*)?$')].fillna('')
+    for col in COLUNAS_ESPERADAS:
+        if col not in df_planilha.columns:
+            df_planilha[col] = ''
+
+    ids_planilha = normalizar_ids(df_planilha['ID Chamado'])
+    df_alteradas = df_alteradas.assign(**{'ID Chamado': normalizar_ids(df_alteradas['ID Chamado'])})
+    alteradas = df_alteradas.drop_duplicates(subset=['ID Chamado'], keep='last').set_index('ID Chamado')
+    colunas = [col for col in COLUNAS_ESPERADAS if col != 'ID Chamado']
+
+    existentes = ids_planilha.isin(alteradas.index)
+    df_planilha.loc[existentes, colunas] = alteradas.loc[ids_planilha[existentes], colunas].to_numpy()
+
+    novas = df_alteradas[~df_alteradas['ID Chamado'].isin(ids_planilha)]
+    return pd.concat([df_planilha, novas[COLUNAS_ESPERADAS]], ignore_index=True).fillna('')
+
+def escapar_texto(valor):
+    """
+    Valores gravados como texto literal (prefixo "'"): os que já começam com "'" e os
+    números com zero à esquerda (ex.: ID '00123'), que o Sheets converteria em 123.
+    """
+    return valor.startswith("'") or (len(valor) > 1 and valor.startswith('0') and valor.isdigit())
+
+def regravar_aba(worksheet, df_alteradas, chave):
+    """
+    Relê a aba, mescla as linhas alteradas e grava de volta (redimensionando a aba),
+    segurando a trava da aba (`chave` = "spreadsheet_id:worksheet_name") do início ao fim.
+    """
+    with trava_da_aba(chave):
+        df_atual = get_as_dataframe(worksheet, header=0, evaluate_formulas=True, dtype=str, index_col=None)
+        set_with_dataframe(
+            worksheet, mesclar_com_planilha(df_atual, df_alteradas), row=1, col=1, resize=True,
+            string_escaping=escapar_texto,
+        )
+
+def salvar_em_multiplas_abas(df_alteradas, fontes):
+    """Regrava, em paralelo, somente as abas (COLUNA_FONTE) que contêm linhas alteradas."""
+    fonte_por_chave = {fonte['chave']: fonte for fonte in fontes}
+
+    abas = {
+        chave: abrir_aba(fonte_por_chave[chave]['spreadsheet_id'], fonte_por_chave[chave]['worksheet_name'])
+        for chave in df_alteradas[COLUNA_FONTE].unique()
+    }
+    with ThreadPoolExecutor(max_workers=min(MAX_CONEXOES_SHEETS, len(abas))) as executor:
+        futuros = [
+            executor.submit(regravar_aba, aba, df_alteradas[df_alteradas[COLUNA_FONTE] == chave], chave)
+            for chave, aba in abas.items()
+        ]
+        for futuro in futuros:
+            futuro.result()
+
+def publicar_alteracoes(df_completo, ids_alterados, textos_alterados):
+    """Avisa as demais sessões (via registro de alterações) quais linhas e textos foram salvos."""
+    df_linhas = df_completo[df_completo['ID Chamado'].isin(ids_alterados)]
+    registro_alteracoes().publicar(df_linhas, df_completo, textos_alterados)
+
+def salvar_dataframe_no_sheets(df_completo_original, ids_alterados, textos_alterados=None):
+    """
+    Escreve o DataFrame de volta no Google Sheets. Retorna True se o salvamento funcionou.
+    `textos_alterados` ({ID Chamado: {coluna: texto}}) só entra no registro de textos após o sucesso.
+    """
+    ids_alterados = [str(id_chamado) for id_chamado in ids_alterados]
+    fontes = listar_fontes_dados() if USAR_GSHEETS else None
+    if fontes:
+        df_completo_original = definir_fontes_novas(df_completo_original.copy(), fontes)
+
+    # Só as linhas alteradas vão para a planilha; o restante (e a quarentena) é relido da própria aba
+    try:
+        df_alteradas = registro_alteracoes().anexar_textos(
+            df_completo_original[df_completo_original['ID Chamado'].isin(ids_alterados)], textos_alterados
+        ).fillna('')
+    except TextosIndisponiveis:
+        st.error("As Observações deste chamado não estão disponíveis no servidor. Os dados serão recarregados; repita a operação.")
+        del st.session_state['dados_chamados']
+        return False
 
     if not USAR_GSHEETS:
         st.session_state.dados_chamados = df_completo_original.copy()
+        publicar_alteracoes(st.session_state.dados_chamados, ids_alterados, textos_alterados)
         st.success("Tabela atualizada e salva no sistema local (Simulação).")
-        return
+        return True
         
-    worksheet = conectar_google_sheets()
-    if worksheet is None:
-        return
+    worksheet = None if fontes else conectar_google_sheets()
+    if not fontes and worksheet is None:
+        return False
 
     try:
-        set_with_dataframe(worksheet, df_para_sheets.fillna(''), row=1, col=1)
+        if fontes:
+            salvar_em_multiplas_abas(df_alteradas, fontes)
+        else:
+            regravar_aba(worksheet, df_alteradas, f"{st.secrets['spreadsheet_id']}:{st.secrets['worksheet_name']}")
         st.session_state.dados_chamados = df_completo_original.copy()
+        publicar_alteracoes(st.session_state.dados_chamados, ids_alterados, textos_alterados)
         # st.session_state.last_saved_id é setado pelo callback/função handle_successful_edit
         st.success("Tabela atualizada e salva no Google Sheets com sucesso!")
+        return True
     except Exception as e:
         st.error(f"Erro ao salvar no Sheets. Verifique as permissões. Erro: {e}")
+        return False
 
 # ----------------------------------------------------------------------
 # --- FUNÇÕES DE CÁLCULO E AUXILIARES ---
@@ -95,24 +359,17 @@ def carregar_dados_e_calcular(df_entrada):
     """Calcula SLA, Duração e define o Status Visual."""
     
     if df_entrada.empty:
-        return pd.DataFrame(columns=COLUNAS_ESPERADAS + ['Duração Total', 'Total de Horas', 'Exige Compl.?', 'Status Visual'])
+        return pd.DataFrame(columns=COLUNAS_TABELA + ['Duração Total', 'Total de Horas', 'Exige Compl.?', 'Status Visual'])
 
     df = df_entrada.copy()
     
-    df['Data'] = df['Data'].astype(str).str.strip()
-    for col in ['Hora Agendamento', 'Hora Chegada', 'Hora Final']:
-        df[col] = df[col].astype(str).str.strip().replace('', '00:00', regex=False)
-
-    data_hora_chegada_str = df['Data'] + ' ' + df['Hora Chegada']
-    data_hora_final_str = df['Data'] + ' ' + df['Hora Final']
-    
-    df['Data/Hora Chegada'] = pd.to_datetime(data_hora_chegada_str, format='%d/%m/%Y %H:%M', errors='coerce')
-    df['Data/Hora Final'] = pd.to_datetime(data_hora_final_str, format='%d/%m/%Y %H:%M', errors='coerce')
+    # Data e Horas já chegam no formato canônico (ver normalizar_dados)
+    df['Data/Hora Chegada'] = pd.to_datetime(df['Data'] + ' ' + df['Hora Chegada'], format='%d/%m/%Y %H:%M')
+    df['Data/Hora Final'] = pd.to_datetime(df['Data'] + ' ' + df['Hora Final'], format='%d/%m/%Y %H:%M')
     
     df['Duração Total'] = df['Data/Hora Final'] - df['Data/Hora Chegada']
     
     df.loc[df['Duração Total'] < timedelta(0), 'Duração Total'] = timedelta(0) 
-    df.loc[df['Duração Total'].isna(), 'Duração Total'] = timedelta(0)
 
     df['Total de Horas'] = df['Duração Total'].apply(
         lambda x: str(x).split('days')[-1].split('.')[0].strip() if x != timedelta(0) else '00:00:00'
@@ -128,7 +385,7 @@ def carregar_dados_e_calcular(df_entrada):
     condicao_concluido = (df['Exige Compl.?'] == 'SIM') & (df['Compl. Aberto?'] == 'SIM')
     df.loc[condicao_concluido, 'Status Visual'] = 'CONCLUÍDO'
 
-    colunas_finais = COLUNAS_ESPERADAS + ['Total de Horas', 'Exige Compl.?', 'Status Visual']
+    colunas_finais = COLUNAS_TABELA + ['Total de Horas', 'Exige Compl.?', 'Status Visual']
     
     return df[colunas_finais].copy()
 
@@ -154,12 +411,22 @@ def colorir_tabela(df_calculado):
     df_estilizado = df_para_exibir.style.apply(estilo_linha, axis=1)
     return df_estilizado
 
-@st.cache_data
-def para_excel(df_completo):
-    """Converte o DataFrame em um arquivo Excel (bytes) para download."""
+@st.cache_data(max_entries=10, ttl=600)
+def para_excel(df_completo, revisao_textos):
+    """
+    Versão em cache de gerar_excel para o botão "Gerar Excel" (poucas entradas, pois cada
+    salvamento muda a chave). `revisao_textos` entra na chave porque os textos não fazem
+    parte do DataFrame.
+    """
+    return gerar_excel(df_completo)
+
+def gerar_excel(df_completo):
+    """Converte o DataFrame em um arquivo Excel (bytes), reanexando os textos longos."""
+    df_completo = registro_alteracoes().anexar_textos(df_completo)
     output = BytesIO()
     with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        colunas_download = [col for col in df_completo.columns if col not in ['Status Visual', 'Data/Hora Chegada', 'Data/Hora Final', 'Duração Total']]
+        colunas_ordenadas = COLUNAS_ESPERADAS + [col for col in df_completo.columns if col not in COLUNAS_ESPERADAS]
+        colunas_download = [col for col in colunas_ordenadas if col not in ['Status Visual', 'Data/Hora Chegada', 'Data/Hora Final', 'Duração Total']]
         df_completo[colunas_download].to_excel(writer, sheet_name='Controle_Chamados', index=False)
     
     return output.getvalue()
@@ -234,11 +501,25 @@ def buscar_id_para_edicao():
         st.session_state.multi_filtered_ids = filtered_ids 
         st.warning(f"{len(filtered_ids)} IDs encontrados. Por favor, selecione um abaixo.")
 
+def forcar_recarga():
+    """Descarta os dados da sessão e reinicia: o próximo rerun relê tudo do Google Sheets."""
+    del st.session_state['dados_chamados']
+    st.rerun()
+
 def inicializar_session_state():
     """Inicializa os estados necessários para a aplicação."""
+    if 'dados_chamados' in st.session_state:
+        # Pode remover 'dados_chamados' quando só uma recarga completa resolve (ex.: cache limpo)
+        sincronizar_dados_da_sessao()
+
     if 'dados_chamados' not in st.session_state:
+        # A versão é lida antes da carga: o que for salvo durante a leitura é reaplicado no próximo rerun
+        marcar_carga_da_sessao()
         st.session_state.dados_chamados = carregar_dados_do_sheets()
 
+    if 'quarentena_chamados' not in st.session_state:
+        st.session_state.quarentena_chamados = pd.DataFrame(columns=COLUNAS_ESPERADAS + [COLUNA_FONTE, 'Motivo'])
+
     if 'filtered_id_to_edit' not in st.session_state:
         st.session_state.filtered_id_to_edit = 'Selecione...'
 
@@ -309,13 +590,15 @@ def show_main_content(df_calculado):
 
         if submetido:
             validado = True
+            id_chamado = normalizar_ids(pd.Series([id_chamado])).iloc[0]
             
             if not id_chamado or not hora_chegada or not hora_final or not projeto:
                 st.error("Por favor, preencha todos os campos obrigatórios (ID Chamado, Hora Chegada, Hora Final, Projeto).")
                 validado = False
             
             id_list = st.session_state.dados_chamados['ID Chamado'].astype(str).str.strip().tolist()
-            if validado and id_chamado.strip() in id_list:
+            id_list += st.session_state.quarentena_chamados['ID Chamado'].astype(str).str.strip().tolist()
+            if validado and id_chamado in id_list:
                 st.error(f"Erro: O ID de Chamado '{id_chamado}' já existe na base de dados. Por favor, verifique.")
                 validado = False
             
@@ -335,19 +618,20 @@ def show_main_content(df_calculado):
                     'Analista BO': analista_bo,
                     'Observações': observacoes,
                     'Projeto': projeto,
+                    COLUNA_FONTE: '',  # Definida no salvamento (aba do projeto)
                 }
                 
-                novo_df = pd.DataFrame([dados_novo_chamado], columns=COLUNAS_ESPERADAS)
+                # 'Observações' fica fora da tabela principal e segue para o registro de textos
+                novo_df = pd.DataFrame([dados_novo_chamado], columns=COLUNAS_SESSAO)
                 df_atualizado = pd.concat([st.session_state.dados_chamados, novo_df], ignore_index=True)
+                textos_novos = {id_chamado: {'Observações': observacoes}}
                 
-                salvar_dataframe_no_sheets(df_atualizado)
-                
-                reset_form_defaults() 
-                del st.session_state['dados_chamados']
-                
-                # 🟢 Chama a função de callback e reinicia
-                handle_successful_save(id_chamado) 
-                st.rerun()
+                if salvar_dataframe_no_sheets(df_atualizado, [id_chamado], textos_novos):
+                    reset_form_defaults() 
+                    
+                    # 🟢 Chama a função de callback e reinicia
+                    handle_successful_save(id_chamado) 
+                    st.rerun()
 
     st.markdown("---")
     
@@ -395,14 +679,38 @@ def show_main_content(df_calculado):
             
             st.dataframe(colorir_tabela(df_filtrado), use_container_width=True, height=500)
 
-            # Download
-            st.download_button(
-                label="📥 Download da Tabela (Excel)",
-                data=para_excel(df_filtrado),
-                file_name="Controle_Chamados_SLA.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                key='download_excel'
+            # Download: o Excel só é gerado no clique e fica na sessão enquanto os dados,
+            # os textos e o filtro continuarem os mesmos
+            assinatura_excel = (
+                st.session_state.registro_dados, st.session_state.versao_dados,
+                registro_alteracoes().revisao_textos, filtro_alerta,
             )
+            excel_gerado = st.session_state.get('excel_exportacao')
+            if excel_gerado is not None and excel_gerado[0] != assinatura_excel:
+                del st.session_state['excel_exportacao']
+                excel_gerado = None
+
+            if excel_gerado is None and st.button("📄 Gerar Excel", key='gerar_excel'):
+                try:
+                    excel_gerado = (assinatura_excel, para_excel(df_filtrado, assinatura_excel[2]))
+                except TextosIndisponiveis:
+                    forcar_recarga()
+                st.session_state.excel_exportacao = excel_gerado
+
+            if excel_gerado is not None:
+                st.download_button(
+                    label="📥 Download da Tabela (Excel)",
+                    data=excel_gerado[1],
+                    file_name="Controle_Chamados_SLA.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                    key='download_excel'
+                )
+
+    df_quarentena = st.session_state.quarentena_chamados
+    if not df_quarentena.empty:
+        with st.expander(f"⚠️ Registros em Quarentena ({len(df_quarentena)})", expanded=False):
+            st.caption("Linhas da planilha com Data, Hora ou ID inválidos. Ficam fora dos cálculos de SLA até serem corrigidas no Google Sheets (as correções aparecem na próxima carga).")
+            st.dataframe(df_quarentena, use_container_width=True, hide_index=True)
 
 
     # --- SEÇÃO 4: EDIÇÃO DE DADOS ---
@@ -469,7 +777,11 @@ def show_main_content(df_calculado):
             hora_final_inicial = datetime.now().time() 
             
         compl_aberto_inicial = df_chamado['Compl. Aberto?']
-        observacoes_inicial = df_chamado['Observações']
+        # Textos longos só são lidos do registro quando o chamado é aberto para edição
+        try:
+            observacoes_inicial = registro_alteracoes().buscar_textos(chamado_selecionado_id)['Observações']
+        except TextosIndisponiveis:
+            forcar_recarga()
         id_compl_aberto_inicial = df_chamado['ID Compl. Aberto']
         projeto_inicial = df_chamado.get('Projeto', 'Outros') 
 
@@ -531,16 +843,13 @@ def show_main_content(df_calculado):
                     df_completo.loc[idx, 'Hora Final'] = nova_hora_final.strftime('%H:%M')
                     df_completo.loc[idx, 'Compl. Aberto?'] = novo_compl_aberto
                     df_completo.loc[idx, 'ID Compl. Aberto'] = novo_id_compl_aberto
-                    df_completo.loc[idx, 'Observações'] = nova_observacoes
                     df_completo.loc[idx, 'Projeto'] = novo_projeto
+                    textos_editados = {chamado_selecionado_id: {'Observações': nova_observacoes}}
                     
-                    salvar_dataframe_no_sheets(df_completo)
-                    
-                    del st.session_state['dados_chamados']
-                    
-                    # 🟢 Chama a função de callback e reinicia
-                    handle_successful_save(chamado_selecionado_id) 
-                    st.rerun()
+                    if salvar_dataframe_no_sheets(df_completo, [chamado_selecionado_id], textos_editados):
+                        # 🟢 Chama a função de callback e reinicia
+                        handle_successful_save(chamado_selecionado_id) 
+                        st.rerun()
 
 # ----------------------------------------------------------------------
 # --- EXECUÇÃO PRINCIPAL ---
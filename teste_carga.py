@@ -0,0 +1,306 @@
+# teste_carga.py (Simulador de carga: N analistas simultâneos, sem navegador e sem Google Sheets)
+#
+# Uso:  python teste_carga.py --sessoes 10 --rodadas 5 --linhas 2000 [--fontes]
+#
+# Com --fontes, a planilha tem uma aba por projeto e o app usa `fontes_dados` (leitura e
+# gravação em várias abas); sem ele, usa a aba única `worksheet_name`.
+#
+# Cada sessão é um AppTest da página principal + um AppTest do Dashboard, executando
+# carga inicial, login, inclusão, busca, edição, filtro, exportação e Dashboard. O Google
+# Sheets é substituído por uma planilha em memória que conta as chamadas de API.
+#
+# As sessões são intercaladas em um único thread (uma ação de cada sessão por vez): o
+# AppTest não suporta execuções em threads paralelos. O estado compartilhado (caches,
+# registro de alterações e planilha) é o mesmo que N abas do navegador veriam.
+
+import argparse
+import random
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from datetime import date, timedelta, time as dtime
+
+import numpy as np
+import pandas as pd
+import gspread
+import gspread_dataframe
+from streamlit.testing.v1 import AppTest
+
+from config import COLUNAS_ESPERADAS, LISTA_PROJETOS, SENHA_ACESSO
+
+ARQUIVO_APP = "streamlit_app.py"
+ARQUIVO_DASHBOARD = "Pages/Dashboard.py"
+ANALISTAS = ['Ana', 'Bruno', 'Carla', 'Diego', 'Elisa', 'Fábio']
+
+# ----------------------------------------------------------------------
+# --- PLANILHA FALSA (SUBSTITUI O GSPREAD) ---
+# ----------------------------------------------------------------------
+
+class PlanilhaFake:
+    """
+    Planilha em memória: guarda uma tabela por aba e conta cada chamada de API,
+    no total e por sessão simulada. Como as sessões se revezam, toda chamada feita
+    durante uma ação (inclusive pelos threads de leitura/gravação do app) é da
+    sessão ativa.
+    """
+
+    def __init__(self, abas_iniciais):
+        self.lock = threading.Lock()
+        self.abas = {nome: df.copy() for nome, df in abas_iniciais.items()}
+        self.chamadas = Counter()
+        self.chamadas_por_sessao = Counter()
+        self.sessao_ativa = None
+
+    def contar(self, operacao):
+        with self.lock:
+            self.chamadas[operacao] += 1
+            self.chamadas_por_sessao[self.sessao_ativa] += 1
+
+    def chamadas_da_sessao(self, sessao):
+        with self.lock:
+            return self.chamadas_por_sessao[sessao]
+
+    def worksheet(self, nome):
+        self.contar('worksheet')
+        with self.lock:
+            self.abas.setdefault(nome, pd.DataFrame(columns=COLUNAS_ESPERADAS))
+        return AbaFake(self, nome)
+
+    def values_batch_get(self, intervalos):
+        self.contar('values_batch_get')
+        blocos = []
+        for intervalo in intervalos:
+            nome = intervalo.strip("'")
+            with self.lock:
+                df = self.abas.setdefault(nome, pd.DataFrame(columns=COLUNAS_ESPERADAS))
+            blocos.append({'range': intervalo, 'values': [list(df.columns)] + df.values.tolist()})
+        return {'valueRanges': blocos}
+
+class AbaFake:
+    def __init__(self, planilha, nome):
+        self.planilha = planilha
+        self.title = nome
+
+class ClienteFake:
+    def __init__(self, planilha):
+        self.planilha = planilha
+
+    def open_by_key(self, spreadsheet_id):
+        self.planilha.contar('open_by_key')
+        return self.planilha
+
+def get_as_dataframe_fake(worksheet, **kwargs):
+    planilha = worksheet.planilha
+    planilha.contar('get_as_dataframe')
+    with planilha.lock:
+        return planilha.abas[worksheet.title].copy()
+
+def set_with_dataframe_fake(worksheet, df, **kwargs):
+    planilha = worksheet.planilha
+    planilha.contar('set_with_dataframe')
+    with planilha.lock:
+        planilha.abas[worksheet.title] = df.astype(str).copy()
+
+def instalar_planilha_fake(planilha):
+    """Redireciona o gspread/gspread_dataframe para a planilha em memória."""
+    cliente = ClienteFake(planilha)
+    gspread.service_account_from_dict = lambda creds: cliente
+    gspread_dataframe.get_as_dataframe = get_as_dataframe_fake
+    gspread_dataframe.set_with_dataframe = set_with_dataframe_fake
+
+def gerar_chamados(quantidade, semente=42):
+    """Gera chamados sintéticos; cerca de 1/3 estoura o SLA de 4 horas."""
+    rng = random.Random(semente)
+    hoje = date.today()
+    linhas = []
+    for i in range(quantidade):
+        chegada = dtime(rng.randint(7, 12), rng.choice([0, 15, 30, 45]))
+        duracao_min = rng.choice([60, 120, 180, 300, 360])
+        final_min = min(chegada.hour * 60 + chegada.minute + duracao_min, 23 * 60 + 59)
+        compl_aberto = rng.choice(['NÃO', 'SIM'])
+        linhas.append({
+            'ID Chamado': str(100000 + i),
+            'Data': (hoje - timedelta(days=rng.randint(0, 365))).strftime('%d/%m/%Y'),
+            'Hora Agendamento': chegada.strftime('%H:%M'),
+            'Hora Chegada': chegada.strftime('%H:%M'),
+            'Hora Final': f"{final_min // 60:02d}:{final_min % 60:02d}",
+            'Compl. Aberto?': compl_aberto,
+            'ID Compl. Aberto': f"C{i}" if compl_aberto == 'SIM' else '',
+            'Analista BO': rng.choice(ANALISTAS),
+            'Observações': rng.choice(['', 'Cliente ausente.', 'Aguardando peça. ' * 20]),
+            'Projeto': rng.choice(LISTA_PROJETOS),
+        })
+    return pd.DataFrame(linhas, columns=COLUNAS_ESPERADAS)
+
+def nome_aba_projeto(projeto):
+    return f"Chamados {projeto}"
+
+def montar_abas(df_chamados, por_projeto):
+    """Uma aba única ('Chamados') ou uma aba por projeto; os IDs nunca se repetem entre abas."""
+    if not por_projeto:
+        return {'Chamados': df_chamados}
+    return {
+        nome_aba_projeto(projeto): df_chamados[df_chamados['Projeto'] == projeto].reset_index(drop=True)
+        for projeto in LISTA_PROJETOS
+    }
+
+# ----------------------------------------------------------------------
+# --- SESSÃO SIMULADA (UM ANALISTA) ---
+# ----------------------------------------------------------------------
+
+def botao(at, rotulo):
+    return next(b for b in at.button if b.label == rotulo)
+
+class SessaoSimulada:
+    """Um analista: AppTest da Home + AppTest do Dashboard compartilhando o mesmo estado."""
+
+    def __init__(self, numero, planilha, metricas, por_projeto=False):
+        self.numero = numero
+        self.planilha = planilha
+        self.metricas = metricas
+        self.por_projeto = por_projeto
+        self.rng = random.Random(numero)
+        self.app = self.novo_app(ARQUIVO_APP)
+        self.dashboard = self.novo_app(ARQUIVO_DASHBOARD)
+
+    def novo_app(self, arquivo):
+        at = AppTest.from_file(arquivo, default_timeout=60)
+        at.secrets["gcp_service_account"] = {}
+        at.secrets["spreadsheet_id"] = "planilha-carga"
+        at.secrets["worksheet_name"] = "Chamados"
+        if self.por_projeto:
+            at.secrets["fontes_dados"] = [
+                {'worksheet_name': nome_aba_projeto(projeto), 'projeto': projeto} for projeto in LISTA_PROJETOS
+            ]
+        return at
+
+    def medir(self, acao, executar):
+        """
+        Executa uma ação, registrando latência e chamadas ao Sheets desta sessão.
+        `executar` devolve o AppTest executado.
+        Qualquer falha (exceção, erro do script ou st.error no AppTest) interrompe o teste.
+        """
+        self.planilha.sessao_ativa = self.numero
+        chamadas_antes = self.planilha.chamadas_da_sessao(self.numero)
+        inicio = time.perf_counter()
+        try:
+            at = executar()
+        finally:
+            self.planilha.sessao_ativa = None
+        latencia = time.perf_counter() - inicio
+        if len(at.exception) or len(at.error):
+            erros = '; '.join(str(e.value) for e in list(at.exception) + list(at.error))
+            raise RuntimeError(f"Sessão {self.numero}, ação '{acao}': {erros}")
+        chamadas = self.planilha.chamadas_da_sessao(self.numero) - chamadas_antes
+        if self.metricas is not None:
+            self.metricas.registrar(acao, latencia, chamadas)
+
+    def login(self):
+        # A primeira execução já lê todas as abas do Sheets (antes da tela de senha)
+        self.medir('carga_inicial', self.app.run)
+        self.app.text_input[0].input(SENHA_ACESSO)
+        self.medir('login', lambda: botao(self.app, "Entrar").click().run())
+
+    def rodada(self, numero_rodada):
+        """Devolve as ações de uma rodada, na ordem, para o rodízio entre as sessões."""
+        at = self.app
+        id_novo = f"CARGA-{self.numero}-{numero_rodada}"
+
+        def incluir():
+            at.text_input(key="new_id").input(id_novo)
+            at.text_input(key="new_analista").input(self.rng.choice(ANALISTAS))
+            at.selectbox(key="new_projeto").select(self.rng.choice(LISTA_PROJETOS))
+            at.time_input(key="new_hora_chegada").set_value(dtime(8, 0))
+            at.time_input(key="new_hora_final").set_value(dtime(self.rng.choice([9, 11, 14]), 0))
+            return botao(at, "Salvar Chamado").click().run()
+
+        def buscar():
+            at.text_input(key="search_input_edit").input(id_novo)
+            return botao(at, "Buscar ID 🔍").click().run()
+
+        def editar():
+            at.text_area(key="edit_obs").input(f"Editado pela sessão {self.numero} na rodada {numero_rodada}.")
+            return botao(at, "Salvar Edição").click().run()
+
+        def filtrar():
+            filtro = next(c for c in at.checkbox if c.label == "Apenas ALERTA")
+            return filtro.set_value(not filtro.value).run()
+
+        def exportar():
+            # Após a edição e o filtro a assinatura mudou: o clique sempre gera um Excel novo
+            return botao(at, "📄 Gerar Excel").click().run()
+
+        def abrir_dashboard():
+            # Replica a navegação entre páginas: o Dashboard enxerga o mesmo session_state
+            for chave in ['logged_in', 'dados_chamados', 'registro_dados', 'versao_dados']:
+                self.dashboard.session_state[chave] = at.session_state[chave]
+            return self.dashboard.run()
+
+        etapas = [('incluir', incluir), ('buscar', buscar), ('editar', editar),
+                  ('filtrar', filtrar), ('exportar', exportar), ('dashboard', abrir_dashboard)]
+        return [lambda acao=acao, executar=executar: self.medir(acao, executar) for acao, executar in etapas]
+
+# ----------------------------------------------------------------------
+# --- COLETA E RELATÓRIO ---
+# ----------------------------------------------------------------------
+
+class Metricas:
+    def __init__(self):
+        self.latencias = defaultdict(list)
+        self.chamadas = defaultdict(int)
+
+    def registrar(self, acao, latencia, chamadas):
+        self.latencias[acao].append(latencia)
+        self.chamadas[acao] += chamadas
+
+    def imprimir(self, planilha, memoria_por_sessao):
+        print(f"\n{'Ação':<14}{'Execuções':>10}{'p50 (ms)':>11}{'p95 (ms)':>11}{'Sheets/ação':>13}")
+        for acao, valores in self.latencias.items():
+            p50, p95 = np.percentile(valores, [50, 95]) * 1000
+            print(f"{acao:<14}{len(valores):>10}{p50:>11.1f}{p95:>11.1f}{self.chamadas[acao] / len(valores):>13.2f}")
+
+        print(f"\nMemória marginal por sessão (após login, descontada a sessão de aquecimento): {memoria_por_sessao / 1024 ** 2:.2f} MiB")
+        print(f"Chamadas ao Sheets por operação: {dict(planilha.chamadas)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do Controle de Chamados com AppTest.")
+    parser.add_argument('--sessoes', type=int, default=5, help="Nº de analistas simultâneos")
+    parser.add_argument('--rodadas', type=int, default=3, help="Ciclos inclusão/busca/edição/filtro/exportação por sessão")
+    parser.add_argument('--linhas', type=int, default=1000, help="Nº de chamados pré-carregados na planilha falsa")
+    parser.add_argument('--fontes', action='store_true', help="Uma aba por projeto, lidas/gravadas via `fontes_dados`")
+    args = parser.parse_args()
+
+    planilha = PlanilhaFake(montar_abas(gerar_chamados(args.linhas), args.fontes))
+    instalar_planilha_fake(planilha)
+    metricas = Metricas()
+
+    # Sessão de aquecimento: absorve imports e caches compartilhados, fora das métricas
+    SessaoSimulada(-1, planilha, None, args.fontes).login()
+
+    tracemalloc.start()
+    memoria_inicial = tracemalloc.get_traced_memory()[0]
+    sessoes = [SessaoSimulada(numero, planilha, metricas, args.fontes) for numero in range(args.sessoes)]
+    for sessao in sessoes:
+        sessao.login()
+    memoria_por_sessao = (tracemalloc.get_traced_memory()[0] - memoria_inicial) / args.sessoes
+    tracemalloc.stop()
+
+    # Rodízio: cada sessão faz uma ação por vez, intercalada com as demais
+    for numero_rodada in range(args.rodadas):
+        acoes = [sessao.rodada(numero_rodada) for sessao in sessoes]
+        for passo in zip(*acoes):
+            for acao in passo:
+                acao()
+
+    # Nenhuma inclusão pode ter se perdido na planilha (nem ter sido gravada em duas abas)
+    ids_gravados = pd.concat(planilha.abas.values())['ID Chamado'].astype(str).value_counts()
+    esperados = {f"CARGA-{sessao.numero}-{r}" for sessao in sessoes for r in range(args.rodadas)}
+    divergentes = sorted(id_ for id_ in esperados if ids_gravados.get(id_, 0) != 1)
+    if divergentes:
+        raise RuntimeError(f"Chamados ausentes ou repetidos na planilha: {divergentes}")
+
+    metricas.imprimir(planilha, memoria_por_sessao)
+
+if __name__ == "__main__":
+    main()